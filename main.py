@@ -1,29 +1,33 @@
 import os
 import sys
 
-from telegram.ext import CommandHandler, Updater, MessageHandler, Filters
+from telegram import Update
+from telegram.ext import Application, CommandHandler, MessageHandler, filters
 
 from telegram_bot import Bot, create_logger
 
+# (command, Bot method name); keep in sync with commands.md
+COMMANDS = (
+    ("nh", "nh"),
+)
+
 
 def start(bot_token: str):
     logger = create_logger("start")
     logger.debug("Start bot")
 
-    updater = Updater(token=bot_token, use_context=True)
-    bot = Bot(updater)
-
-    dispatcher = updater.dispatcher
+    application = Application.builder().token(bot_token).build()
+    bot = Bot(application)
 
     logger.debug("Register command handlers")
     # CommandHandler
-    dispatcher.add_handler(CommandHandler("nh", bot.nh))
-    dispatcher.add_handler(
-        MessageHandler(Filters.text | Filters.video | Filters.audio | Filters.photo, bot.handle_message))
+    application.add_handlers([CommandHandler(command, getattr(bot, method)) for command, method in COMMANDS])
+    application.add_handler(
+        MessageHandler(filters.TEXT | filters.VIDEO | filters.AUDIO | filters.PHOTO, bot.handle_message))
 
     logger.info("Running")
-    updater.start_polling()
-    updater.idle()
+    application.run_polling(timeout=30, bootstrap_retries=-1,
+                            allowed_updates=[Update.MESSAGE, Update.CHANNEL_POST])
 
 
 if __name__ == "__main__":
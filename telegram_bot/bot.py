@@ -1,64 +1,84 @@
+import functools
 import re
 
-from bs4 import BeautifulSoup
-from telegram import ParseMode, Update, Message
-from telegram.ext import CallbackContext, Updater
+from telegram import Update, Message, MessageEntity
+from telegram.constants import ParseMode
+from telegram.ext import Application, ContextTypes
 
 from .logger import create_logger
 
-NH_TEXT_REGEX = re.compile(r".*\bnh\b.*", re.IGNORECASE | re.MULTILINE)
+NH_TEXT_REGEX = re.compile(r"\bnh\b", re.IGNORECASE)
+NH_TEXT_CACHE_MAX_LENGTH = 256
 
 
 def is_nh_text(text: str) -> bool:
-    return "nh" == text or NH_TEXT_REGEX.match(text)
+    if not text or "nh" not in text.lower():
+        return False
+
+    # only cache short texts, long ones are practically unique
+    if len(text) < NH_TEXT_CACHE_MAX_LENGTH:
+        return _is_nh_text_cached(text)
+
+    return NH_TEXT_REGEX.search(text) is not None
+
+
+@functools.lru_cache(maxsize=1024)
+def _is_nh_text_cached(text: str) -> bool:
+    return NH_TEXT_REGEX.search(text) is not None
 
 
 def is_nh_spoiler(update: Update) -> bool:
-    entities = update.effective_message.entities or update.effective_message.caption_entities
+    message = update.effective_message
+
+    # a spoiler can only contain nh if the whole text does
+    text = message.text or message.caption
+    if not text or "nh" not in text.lower():
+        return False
 
-    if any(entity.type == "spoiler" for entity in entities):
-        html = update.effective_message.text_html or update.effective_message.caption_html
-        soup = BeautifulSoup(html, "html.parser")
-        spoilers = soup.find_all("span", {"class": "tg-spoiler"})
-        for spoiler in spoilers:
-            if is_nh_text(" ".join(spoiler.strings)):
-                return True
+    if message.text:
+        spoilers = message.parse_entities([MessageEntity.SPOILER])
+    else:
+        spoilers = message.parse_caption_entities([MessageEntity.SPOILER])
 
-    return False
+    return any(is_nh_text(spoiler) for spoiler in spoilers.values())
 
 
 class Bot:
-    def __init__(self, updater: Updater):
-        self.updater = updater
+    def __init__(self, application: Application):
+        self.application = application
         self.logger = create_logger("nhbot")
 
-    def send_nh_sticker(self, chat_id: int, message_id: str,
-                        sticker_id: str = "CAACAgIAAxkBAAIMHmAPFkBuPZpefXalATwEaInrpyEKAAIPAAPgLXoN0KhdkOTTb1EeBA") -> None:
-        self.updater.bot.send_sticker(chat_id=chat_id, sticker=sticker_id, reply_to_message_id=message_id)
+    async def send_nh_sticker(self, chat_id: int, message_id: str,
+                              sticker_id: str = "CAACAgIAAxkBAAIMHmAPFkBuPZpefXalATwEaInrpyEKAAIPAAPgLXoN0KhdkOTTb1EeBA") -> None:
+        await self.application.bot.send_sticker(chat_id=chat_id, sticker=sticker_id, reply_to_message_id=message_id)
 
-    def handle_message(self, update: Update, _: CallbackContext) -> None:
+    async def handle_message(self, update: Update, _: ContextTypes.DEFAULT_TYPE) -> None:
         if update.edited_message:
             return None
 
-        self.logger.info("Handle message: {}".format(update.effective_message.text))
-        if update.effective_message:
-            message = update.effective_message
-            text = message.text if message.text else message.caption
-            if is_nh_spoiler(update):
-                self.send_message(chat_id=str(update.effective_message.chat_id), text="||nh||",
-                                  parse_mode=ParseMode.MARKDOWN_V2)
-            elif text and is_nh_text(text):
-                self.send_nh_sticker(chat_id=update.effective_message.chat_id,
-                                     message_id=update.effective_message.message_id)
+        message = update.effective_message
+        if not message:
+            return None
+
+        # commands have their own handlers
+        text = message.text or message.caption
+        if not text or text.startswith("/"):
+            return None
+
+        self.logger.info("Handle message: %s", text)
+        if is_nh_spoiler(update):
+            await self.send_message(chat_id=str(message.chat_id), text="||nh||", parse_mode=ParseMode.MARKDOWN_V2)
+        elif is_nh_text(text):
+            await self.send_nh_sticker(chat_id=message.chat_id, message_id=message.message_id)
         return None
 
-    def nh(self, update: Update, _: CallbackContext) -> None:
+    async def nh(self, update: Update, _: ContextTypes.DEFAULT_TYPE) -> None:
+        message = update.effective_message
         if is_nh_spoiler(update):
-            self.send_message(chat_id=str(update.effective_message.chat_id), text="||nh||",
-                              parse_mode=ParseMode.MARKDOWN_V2)
+            await self.send_message(chat_id=str(message.chat_id), text="||nh||", parse_mode=ParseMode.MARKDOWN_V2)
         else:
-            self.send_nh_sticker(chat_id=update.effective_message.chat_id,
-                                 message_id=update.effective_message.message_id)
+            await self.send_nh_sticker(chat_id=message.chat_id, message_id=message.message_id)
 
-    def send_message(self, *, chat_id: str, text: str, **kwargs) -> Message:
-        return self.updater.bot.send_message(chat_id=chat_id, text=text, disable_web_page_preview=True, **kwargs)
+    async def send_message(self, *, chat_id: str, text: str, **kwargs) -> Message:
+        return await self.application.bot.send_message(chat_id=chat_id, text=text, disable_web_page_preview=True,
+                                                       **kwargs)